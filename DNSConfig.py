@@ -23,6 +23,13 @@ class Resolver:
     def __repr__(self):
         return f"Resolver(interface='{self.interface}', ip='{self.ip}', source='{self.source}')"
 
+    def to_dict(self):
+        return {"interface": self.interface, "ip": self.ip, "source": self.source, "isActive": self.isActive}
+
+    @staticmethod
+    def from_dict(data: dict):
+        return Resolver(data["interface"], data["ip"], data["source"], data.get("isActive", True))
+
     def sort_key(self):
         if self.ip.lower() == "unknown":
             ip_key = ip_address("255.255.255.255")
@@ -42,13 +49,44 @@ class DNSConfigChecker:
     def __init__(self, interfaces, netinfo: NetworkInterfaces):
         self.interfaces = interfaces
         self.netinfo = netinfo
+        self._resolver_cache = {}
 
     def get_resolvers(self):
+        result = self._discover_resolvers(self.interfaces)
+        self.load_resolvers(result)
+        return Resolver.sort_resolvers(result)
+
+    def load_resolvers(self, resolvers):
+        self._resolver_cache = {}
+        for resolver in resolvers:
+            self._resolver_cache.setdefault(resolver.interface, []).append(resolver)
+
+    def refresh_resolvers(self, interfaces, diff):
+        # Re-run discovery only for interfaces the NetworkInterfaces diff reports as changed
+        self.interfaces = interfaces
+        changed = diff.changed_interfaces()
+        for iface in changed:
+            self._resolver_cache.pop(iface, None)
+
+        stale = [interface for interface in interfaces if interface[0] in changed]
+        # scutil can report tun resolvers outside the online list; any other change (awdl0, llw0 flapping)
+        # on an interface we do not query needs no discovery at all
+        if stale or any("tun" in iface for iface in changed):
+            for resolver in self._discover_resolvers(stale, only=changed):
+                self._resolver_cache.setdefault(resolver.interface, []).append(resolver)
+
+        current = {interface[0] for interface in interfaces}
+        result = [resolver for iface, resolvers in self._resolver_cache.items()
+                  for resolver in resolvers
+                  if iface in current or "tun" in iface]
+        return Resolver.sort_resolvers(result)
+
+    def _discover_resolvers(self, interfaces, only=None):
         # Check CUSTOM resolvers (networksetup)
         service_to_interface = self._get_service_to_interface_map()
         interface_to_service = self._get_interface_to_service_map()
         custom_resolvers = []
-        for interface in self.interfaces:
+        for interface in interfaces:
             service = interface_to_service.get(interface[0], None)
             if service:
                 try:
@@ -62,7 +100,7 @@ class DNSConfigChecker:
         dhcp_resolvers = []
 
         #check DHCP resolvers (ipconfig)
-        for interface in self.interfaces:
+        for interface in interfaces:
             try:
                 output = subprocess.check_output(["ipconfig", "getpacket", interface[0]], text=True).strip()
                 if "domain_name_server" in output:
@@ -97,6 +135,8 @@ class DNSConfigChecker:
                             if ip:
                                 ips.append(ip.strip())
 
+                if only is not None and interface not in only:
+                    continue
                 if interface and ips and "tun" in interface:
                     for ip in ips:
                         vpn_resolvers.append(Resolver(interface, ip, "VPN Tunnel Provided"))
@@ -104,7 +144,7 @@ class DNSConfigChecker:
         except subprocess.CalledProcessError:
             pass
         # Search for utun interfaces without DNS provided (VPN Intercepted)
-        for interface in self.interfaces:
+        for interface in interfaces:
             if "tun" in interface[0]:
                 try:
                     output = subprocess.check_output(["scutil", "--dns"], text=True).strip()
@@ -138,10 +178,7 @@ class DNSConfigChecker:
                 else:
                     resolver.isActive = True
 
-
-
-
-        return Resolver.sort_resolvers(result)
+        return result
 
     def _get_service_to_interface_map(self):
         output = subprocess.check_output(["networksetup", "-listallhardwareports"], text=True)
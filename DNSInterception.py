@@ -0,0 +1,235 @@
+import secrets
+import statistics
+from time import perf_counter
+
+import dns.message
+import dns.query
+import dns.rcode
+import dns.rdataclass
+import dns.rdatatype
+
+from DNSConfig import Resolver
+from ProbeScheduler import ProbeScheduler
+
+
+class ProbeResult:
+    def __init__(self, success: bool, rcode: int = None, records=frozenset(), ttl: int = None,
+                 rtt: float = None, error: str = None):
+        self.success = success
+        self.rcode = rcode
+        self.records = records
+        self.ttl = ttl
+        self.rtt = rtt
+        self.error = error
+
+    def __repr__(self):
+        if not self.success:
+            return f"ProbeResult(error='{self.error}')"
+        return (f"ProbeResult(rcode={dns.rcode.to_text(self.rcode)}, records={sorted(self.records)}, "
+                f"ttl={self.ttl}, rtt={self.rtt:.4f})")
+
+
+class InterceptionVerdict:
+    LOCAL = "Local"
+    DIRECT = "Direct"
+    INTERCEPTED = "Intercepted"
+    UNREACHABLE = "Unreachable"
+
+    def __init__(self, interface: str, label: str, ip: str, status: str, reasons=None, rtt: float = None):
+        self.interface = interface
+        self.label = label
+        self.ip = ip
+        self.status = status
+        self.reasons = reasons or []
+        self.rtt = rtt
+
+    def __repr__(self):
+        return (f"InterceptionVerdict(interface='{self.interface}', label='{self.label}', ip='{self.ip}', "
+                f"status='{self.status}', reasons={self.reasons})")
+
+    def to_dict(self):
+        return {"interface": self.interface, "label": self.label, "ip": self.ip,
+                "status": self.status, "reasons": self.reasons, "rtt": self.rtt}
+
+    @staticmethod
+    def from_dict(data: dict):
+        return InterceptionVerdict(data["interface"], data["label"], data["ip"], data["status"],
+                                   data.get("reasons"), data.get("rtt"))
+
+
+class DNSInterceptionDetector:
+    NONCE_ZONE = "example.com"
+    # Each probe is sent unchanged to every path so the answers can be compared side by side
+    PROBE_QUERIES = {
+        "nonce": (None, "A", "IN"),
+        "whoami": ("o-o.myaddr.l.google.com", "TXT", "IN"),
+        "identity": ("id.server", "TXT", "CH"),
+        "cache": ("google.com", "A", "IN"),
+    }
+    TIMING_TOLERANCE = 0.002
+    TIMING_RATIO = 0.2
+
+    def __init__(self, interfaces, resolvers: list[Resolver], public_servers: dict, timeout=2, port=53,
+                 scheduler: ProbeScheduler = None, priority=ProbeScheduler.INTERACTIVE):
+        self.interfaces = interfaces
+        self.resolvers = resolvers
+        self.public_servers = public_servers
+        self.timeout = timeout
+        self.port = port
+        self.scheduler = scheduler or ProbeScheduler.shared()
+        self.priority = priority
+
+    def detect(self):
+        nonce_name = f"gov6-{secrets.token_hex(6)}.{self.NONCE_ZONE}"
+        paths = self._build_paths()
+        tasks = [
+            (path, key, nonce_name if qname is None else qname, rdtype, rdclass)
+            for path in paths
+            for key, (qname, rdtype, rdclass) in self.PROBE_QUERIES.items()
+        ]
+
+        results = {path: {} for path in paths}
+        # All paths and probes are queued at once; within the scheduler's burst limits the whole
+        # check costs roughly one round trip
+        futures = [
+            (path, key, self.scheduler.submit(path[0], path[2], self._query, path[3], path[2],
+                                              qname, rdtype, rdclass, priority=self.priority))
+            for path, key, qname, rdtype, rdclass in tasks
+        ]
+        for path, key, future in futures:
+            results[path][key] = future.result()
+
+        verdicts = []
+        for iface, _ in self.interfaces:
+            iface_results = {path: res for path, res in results.items() if path[0] == iface}
+            verdicts.extend(self._classify(iface, iface_results))
+        return verdicts
+
+    def _build_paths(self):
+        # A path is (interface, label, target ip, source ip); source is None when the family is missing
+        paths = []
+        for iface, (v4_ip, v6_ip) in self.interfaces:
+            for resolver in self.resolvers:
+                if resolver.interface != iface or resolver.ip.lower() == "unknown" or not resolver.isActive:
+                    continue
+                source = v6_ip if ':' in resolver.ip else v4_ip
+                paths.append((iface, f"{resolver.source} resolver", resolver.ip, source))
+            for name, addresses in self.public_servers.items():
+                for ip in addresses:
+                    source = v6_ip if ':' in ip else v4_ip
+                    paths.append((iface, name, ip, source))
+        return paths
+
+    def _query(self, source_ip, target_ip, qname, rdtype, rdclass):
+        if not source_ip:
+            return ProbeResult(False, error=f"No {'IPv6' if ':' in target_ip else 'IPv4'} source address")
+        try:
+            query = dns.message.make_query(qname, dns.rdatatype.from_text(rdtype),
+                                           dns.rdataclass.from_text(rdclass))
+            start = perf_counter()
+            response = dns.query.udp(query, target_ip, port=self.port, timeout=self.timeout, source=source_ip)
+            rtt = perf_counter() - start
+        except Exception as e:
+            return ProbeResult(False, error=str(e))
+
+        records = set()
+        ttls = []
+        for rrset in response.answer:
+            ttls.append(rrset.ttl)
+            for rr in rrset:
+                if rrset.rdtype == dns.rdatatype.TXT:
+                    text = b"".join(rr.strings).decode(errors="replace")
+                    # Google appends the ECS subnet, which differs per vantage point rather than per resolver
+                    if text.startswith("edns0-client-subnet"):
+                        continue
+                    records.add(text)
+                else:
+                    records.add(rr.to_text())
+        return ProbeResult(True, response.rcode(), frozenset(records), min(ttls) if ttls else None, rtt)
+
+    def _classify(self, iface, iface_results):
+        local_paths = [path for path in iface_results if path[1] not in self.public_servers]
+        public_paths = [path for path in iface_results if path[1] in self.public_servers]
+
+        verdicts = []
+        for path in local_paths:
+            status = (InterceptionVerdict.LOCAL if self._reachable(iface_results[path])
+                      else InterceptionVerdict.UNREACHABLE)
+            verdicts.append(InterceptionVerdict(iface, path[1], path[2], status,
+                                                rtt=self._median_rtt(iface_results[path])))
+
+        for path in public_paths:
+            probes = iface_results[path]
+            if not self._reachable(probes):
+                errors = {probe.error for probe in probes.values() if probe.error}
+                verdicts.append(InterceptionVerdict(iface, path[1], path[2], InterceptionVerdict.UNREACHABLE,
+                                                    sorted(errors)))
+                continue
+
+            strong, weak = [], []
+            shares_egress = False
+            nonce = probes["nonce"]
+            if nonce.success and nonce.rcode == dns.rcode.NOERROR and nonce.records:
+                strong.append("Synthesized answer for a nonexistent nonce name")
+
+            for other in public_paths:
+                if other[1] == path[1]:
+                    continue
+                other_probes = iface_results[other]
+                if self._same_records(probes["whoami"], other_probes["whoami"]):
+                    strong.append(f"Same whoami egress as {other[1]} ({other[2]})")
+                if self._same_records(probes["identity"], other_probes["identity"]):
+                    strong.append(f"Same server identity as {other[1]} ({other[2]})")
+
+            for local in local_paths:
+                # A public server configured as the local resolver is the same path, not evidence against it
+                if local[2] == path[2]:
+                    continue
+                local_probes = iface_results[local]
+                # A local resolver answering with this provider's identity forwards to it (router, Pi-hole),
+                # so its egress, cache and timing naturally match this path and say nothing about redirection
+                if self._same_records(probes["identity"], local_probes["identity"]):
+                    continue
+                if self._same_records(probes["whoami"], local_probes["whoami"]):
+                    shares_egress = True
+                    weak.append(f"Same whoami egress as local resolver {local[2]}")
+                if self._same_cache(probes["cache"], local_probes["cache"]):
+                    weak.append(f"Shares cached TTL with local resolver {local[2]}")
+                if self._same_timing(probes, local_probes):
+                    weak.append(f"Response timing matches local resolver {local[2]}")
+
+            # Fresh TTLs and nearby anycast timing coincide on clean networks, so weak signals only
+            # count when the path also leaves the network through the local resolver's egress
+            intercepted = bool(strong) or (shares_egress and len(weak) >= 2)
+            status = InterceptionVerdict.INTERCEPTED if intercepted else InterceptionVerdict.DIRECT
+            verdicts.append(InterceptionVerdict(iface, path[1], path[2], status, strong + weak,
+                                                rtt=self._median_rtt(probes)))
+        return verdicts
+
+    @staticmethod
+    def _reachable(probes):
+        return any(probe.success for probe in probes.values())
+
+    @staticmethod
+    def _median_rtt(probes):
+        rtts = [probe.rtt for probe in probes.values() if probe.success]
+        return statistics.median(rtts) if rtts else None
+
+    @staticmethod
+    def _same_records(first: ProbeResult, second: ProbeResult):
+        return first.success and second.success and bool(first.records) and first.records == second.records
+
+    @staticmethod
+    def _same_cache(first: ProbeResult, second: ProbeResult):
+        if not DNSInterceptionDetector._same_records(first, second):
+            return False
+        if first.ttl is None or second.ttl is None:
+            return False
+        return abs(first.ttl - second.ttl) <= 1
+
+    def _same_timing(self, probes, local_probes):
+        public_rtt = self._median_rtt(probes)
+        local_rtt = self._median_rtt(local_probes)
+        if public_rtt is None or local_rtt is None:
+            return False
+        return abs(public_rtt - local_rtt) <= max(self.TIMING_TOLERANCE, self.TIMING_RATIO * local_rtt)
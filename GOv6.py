@@ -1,13 +1,18 @@
 import platform
 import socket
 import subprocess
+import threading
+from concurrent.futures import CancelledError
 from time import sleep
 
 import dns.message
 import dns.query
 
-from DNSConfig import DNSConfigChecker
-from NetworkInterfaces import NetworkInterfaces
+from DNSConfig import DNSConfigChecker, Resolver
+from DNSInterception import DNSInterceptionDetector, InterceptionVerdict
+from NetworkInterfaces import InterfaceDiff, NetworkInterfaces
+from ProbeScheduler import ProbeScheduler
+from StateCache import NetworkFingerprint, NetworkStateCache
 from output import CLIOutputManager
 
 PUBLIC_DNS_SERVERS = {
@@ -18,6 +23,9 @@ PUBLIC_DNS_SERVERS = {
     "CleanBrowsing": ("185.228.168.9", "2a0d:2a00:1::"),
 }
 
+# How long a warm start waits at exit for the background revalidation before leaving it behind
+REVALIDATION_WAIT = 2.0
+
 class IPv6Enabler:
     def __init__(self, interfaces: list[str]):
         self.interfaces = interfaces
@@ -101,12 +109,14 @@ class IPv6Enabler:
             return False, f"Failed to bounce interface {interface}: {e}"
 
 class DNSProbe:
-    def __init__(self, interface_name: str, netinfo: NetworkInterfaces, timeout=2):
+    def __init__(self, interface_name: str, netinfo: NetworkInterfaces, timeout=2,
+                 scheduler: ProbeScheduler = None, priority=ProbeScheduler.INTERACTIVE):
         self.interface_name = interface_name
         self.netinfo = netinfo
         self.timeout = timeout
-        self.v4_ip = self.netinfo.get_ip(interface_name, socket.AF_INET)
-        self.v6_ip = self.netinfo.get_ip(interface_name, socket.AF_INET6)
+        self.scheduler = scheduler or ProbeScheduler.shared()
+        self.priority = priority
+        self.v4_ip, self.v6_ip = self.netinfo.get_ip_pair(interface_name)
 
     def dig_over_interface(self, dns_ip, record_type="AAAA"):
         family = socket.AF_INET6 if ':' in dns_ip else socket.AF_INET
@@ -140,9 +150,18 @@ class DNSProbe:
 
     def check_dns_connectivity(self, dns_servers: dict, verbose=True):
         v4_success, v6_success = [], []
-        for dns_name, (v4_ip, v6_ip) in dns_servers.items():
-            v4_result = self.dig_over_interface(v4_ip, record_type="A")
-            v6_result = self.dig_over_interface(v6_ip, record_type="AAAA")
+        # Every query goes out through the scheduler at once; its token buckets do the pacing
+        pending = [
+            (dns_name,
+             self.scheduler.submit(self.interface_name, v4_ip, self.dig_over_interface, v4_ip,
+                                   record_type="A", priority=self.priority),
+             self.scheduler.submit(self.interface_name, v6_ip, self.dig_over_interface, v6_ip,
+                                   record_type="AAAA", priority=self.priority))
+            for dns_name, (v4_ip, v6_ip) in dns_servers.items()
+        ]
+        for dns_name, v4_future, v6_future in pending:
+            v4_result = v4_future.result()
+            v6_result = v6_future.result()
 
             if v4_result['success']:
                 v4_success.append((dns_name, v4_result['answers']))
@@ -158,11 +177,9 @@ class DNSProbe:
                     "\033[32m|  DNSv6 Reachable  |\033[0m" if v6_result['success']
                     else f"\033[31m| DNSv6 Unreachable | ERROR: {v6_result.get('error', '')} |\033[0m",
                 )
-            sleep(0.5)
         return (v4_success, v6_success)
 
 
-
 def check_interface_ips():
     IPmap = netinfo.get_ip_list(active_interfaces, verbose=True)
     not_ipv6_capable = [iface for iface, (v4, v6) in IPmap.items() if v4 and not v6 and not iface.startswith("lo") and "tun" not in iface]
@@ -184,17 +201,75 @@ def check_interface_ips():
                 status = "\033[32mOK\033[0m" if result["success"] else "\033[31mFAILED\033[0m"
                 print(f"{status} {iface}: {result['message']}")
                 sleep(1)
+            generation = netinfo.generation
+            refresh_interfaces()
+            if netinfo.generation == generation:
+                CLIOutputManager.print_ipv6_enable_failed_message()
+                return
             check_interface_ips()
     else:
         print("\033[32mAll online interfaces already support IPv6!\033[0m")
 
 
+def refresh_interfaces():
+    global active_interfaces
+    diff = netinfo.refresh()
+    if diff:
+        active_interfaces = netinfo.list_active_interfaces(verbose=False)
+    return diff
+
+
 def lookup_online_interfaces():
     IPmap = netinfo.get_ip_list(active_interfaces, verbose=False)
     online_interfaces = [(iface, (v4, v6)) for iface, (v4, v6) in IPmap.items() if v4 and "lo" not in iface]
     return online_interfaces
 
 
+def verify_dns_state(online_interfaces, priority=ProbeScheduler.INTERACTIVE, cached_state=None):
+    dns_checker = DNSConfigChecker(online_interfaces, netinfo)
+    if cached_state:
+        # Resolver configuration follows interface state, so only interfaces that changed since the
+        # cached snapshot are rediscovered; interception is a live property and is always re-probed
+        dns_checker.load_resolvers([Resolver.from_dict(data) for data in cached_state["resolvers"]])
+        cached_snapshot = NetworkInterfaces.snapshot_from_dict(cached_state.get("interfaces", {}))
+        diff = InterfaceDiff.compute(cached_snapshot, netinfo.snapshot)
+        resolvers = dns_checker.refresh_resolvers(online_interfaces, diff)
+    else:
+        resolvers = dns_checker.get_resolvers()
+    detector = DNSInterceptionDetector(online_interfaces, resolvers, PUBLIC_DNS_SERVERS, priority=priority)
+    verdicts = detector.detect()
+    return resolvers, verdicts
+
+
+def print_dns_state(resolvers, verdicts):
+    for resolver in resolvers:
+        CLIOutputManager.print_resolver_status(resolver)
+
+    CLIOutputManager.print_checking_interception()
+    for verdict in verdicts:
+        CLIOutputManager.print_interception_status(verdict)
+
+
+def save_dns_state(state_cache, fingerprint, resolvers, verdicts):
+    state_cache.save(fingerprint, {
+        "interfaces": netinfo.snapshot_to_dict(),
+        "resolvers": [resolver.to_dict() for resolver in resolvers],
+        "verdicts": [verdict.to_dict() for verdict in verdicts],
+    })
+
+
+def revalidate_dns_state(state_cache, fingerprint, online_interfaces, cached_state, outcome, abandoned):
+    try:
+        state = verify_dns_state(online_interfaces, priority=ProbeScheduler.BACKGROUND, cached_state=cached_state)
+    except CancelledError:
+        return
+    # An abandoned re-check must not overwrite the cache while the process is exiting
+    if abandoned.is_set():
+        return
+    outcome["state"] = state
+    save_dns_state(state_cache, fingerprint, *state)
+
+
 if __name__ == "__main__":
     CLIOutputManager.print_banner()
 
@@ -221,9 +296,44 @@ if __name__ == "__main__":
     CLIOutputManager.print_phase_2()
 
     print("\033[36mChecking your DNS configurations\033[0m")
-    dns_checker = DNSConfigChecker(online_interfaces, netinfo)
-    resolvers = dns_checker.get_resolvers()
-    for resolver in resolvers:
-        CLIOutputManager.print_resolver_status(resolver)
+    state_cache = NetworkStateCache()
+    fingerprint = NetworkFingerprint(netinfo).compute()
+    cached_state = state_cache.load(fingerprint)
+    revalidation = None
+    revalidation_outcome = {}
+    revalidation_abandoned = threading.Event()
+
+    if cached_state:
+        # Same network as a recent run: show the last verified results and re-check them in the background
+        CLIOutputManager.print_using_cached_state()
+        resolvers = [Resolver.from_dict(data) for data in cached_state["resolvers"]]
+        verdicts = [InterceptionVerdict.from_dict(data) for data in cached_state["verdicts"]]
+        revalidation = threading.Thread(
+            target=revalidate_dns_state,
+            args=(state_cache, fingerprint, online_interfaces, cached_state, revalidation_outcome,
+                  revalidation_abandoned),
+            daemon=True,
+        )
+        revalidation.start()
+    else:
+        resolvers, verdicts = verify_dns_state(online_interfaces)
+        save_dns_state(state_cache, fingerprint, resolvers, verdicts)
+    print_dns_state(resolvers, verdicts)
+
+    if revalidation:
+        revalidation.join(timeout=REVALIDATION_WAIT)
+        if revalidation.is_alive():
+            revalidation_abandoned.set()
+            ProbeScheduler.shared().shutdown(wait=False, cancel_pending=True)
+            CLIOutputManager.print_revalidation_pending()
+        elif revalidation_outcome.get("state"):
+            fresh_resolvers, fresh_verdicts = revalidation_outcome["state"]
+            if (
+                [resolver.to_dict() for resolver in fresh_resolvers] != [resolver.to_dict() for resolver in resolvers]
+                or [verdict.status for verdict in fresh_verdicts] != [verdict.status for verdict in verdicts]
+            ):
+                CLIOutputManager.print_cached_state_changed()
+                print_dns_state(fresh_resolvers, fresh_verdicts)
+
     CLIOutputManager.print_phase_3()
 
@@ -5,10 +5,103 @@ from psutil import net_if_stats, net_if_addrs
 from output import CLIOutputManager
 
 
+class InterfaceDiff:
+    def __init__(self, added=(), removed=(), went_up=(), went_down=(),
+                 addresses_gained=None, addresses_lost=None):
+        self.added = set(added)
+        self.removed = set(removed)
+        self.went_up = set(went_up)
+        self.went_down = set(went_down)
+        self.addresses_gained = addresses_gained or {}
+        self.addresses_lost = addresses_lost or {}
+
+    def __repr__(self):
+        return (f"InterfaceDiff(added={sorted(self.added)}, removed={sorted(self.removed)}, "
+                f"went_up={sorted(self.went_up)}, went_down={sorted(self.went_down)}, "
+                f"addresses_gained={self.addresses_gained}, addresses_lost={self.addresses_lost})")
+
+    def __bool__(self):
+        return bool(self.changed_interfaces())
+
+    def changed_interfaces(self):
+        return (self.added | self.removed | self.went_up | self.went_down
+                | set(self.addresses_gained) | set(self.addresses_lost))
+
+    @staticmethod
+    def compute(old_snapshot, new_snapshot):
+        added = new_snapshot.keys() - old_snapshot.keys()
+        removed = old_snapshot.keys() - new_snapshot.keys()
+        went_up, went_down = set(), set()
+        addresses_gained, addresses_lost = {}, {}
+
+        for iface in old_snapshot.keys() & new_snapshot.keys():
+            old_up, old_addrs = old_snapshot[iface]
+            new_up, new_addrs = new_snapshot[iface]
+            if new_up and not old_up:
+                went_up.add(iface)
+            elif old_up and not new_up:
+                went_down.add(iface)
+            if new_addrs - old_addrs:
+                addresses_gained[iface] = sorted(new_addrs - old_addrs)
+            if old_addrs - new_addrs:
+                addresses_lost[iface] = sorted(old_addrs - new_addrs)
+
+        for iface in added:
+            if new_snapshot[iface][1]:
+                addresses_gained[iface] = sorted(new_snapshot[iface][1])
+        for iface in removed:
+            if old_snapshot[iface][1]:
+                addresses_lost[iface] = sorted(old_snapshot[iface][1])
+
+        return InterfaceDiff(added, removed, went_up, went_down, addresses_gained, addresses_lost)
+
+
 class NetworkInterfaces:
     def __init__(self):
+        self.generation = 0
+        self._ip_cache = {}
+        self._load()
+
+    def _load(self):
         self.interfaces_stats = net_if_stats()
         self.interfaces_addrs = net_if_addrs()
+        self.snapshot = self._take_snapshot()
+
+    def _take_snapshot(self):
+        snapshot = {}
+        for iface in self.interfaces_stats.keys() | self.interfaces_addrs.keys():
+            stats = self.interfaces_stats.get(iface)
+            addrs = frozenset(
+                (addr.family, addr.address.split('%')[0])
+                for addr in self.interfaces_addrs.get(iface, [])
+                if addr.family in (socket.AF_INET, socket.AF_INET6)
+            )
+            snapshot[iface] = (bool(stats and stats.isup), addrs)
+        return snapshot
+
+    def refresh(self):
+        # Re-read psutil and only invalidate what changed since the previous snapshot
+        old_snapshot = self.snapshot
+        self._load()
+        diff = InterfaceDiff.compute(old_snapshot, self.snapshot)
+        if diff:
+            self.generation += 1
+            for iface in diff.changed_interfaces():
+                self._ip_cache.pop(iface, None)
+        return diff
+
+    def snapshot_to_dict(self):
+        return {
+            iface: {"up": isup, "addresses": sorted([int(family), address] for family, address in addrs)}
+            for iface, (isup, addrs) in self.snapshot.items()
+        }
+
+    @staticmethod
+    def snapshot_from_dict(data: dict):
+        return {
+            iface: (entry["up"], frozenset((family, address) for family, address in entry["addresses"]))
+            for iface, entry in data.items()
+        }
 
     def list_active_interfaces(self, verbose=True):
         active = []
@@ -43,12 +136,20 @@ class NetworkInterfaces:
 
         return link_local if family == socket.AF_INET6 else None
 
+    def get_ip_pair(self, interface_name):
+        # Cached per interface until a refresh() reports it as changed
+        if interface_name not in self._ip_cache:
+            self._ip_cache[interface_name] = (
+                self.get_ip(interface_name, socket.AF_INET),
+                self.get_ip(interface_name, socket.AF_INET6),
+            )
+        return self._ip_cache[interface_name]
+
     def get_ip_list(self, interfaces, verbose=False):
         ip_list = {}
         for iface, stats in interfaces:
-            v4_ip = self.get_ip(iface, socket.AF_INET)
-            v6_ip = self.get_ip(iface, socket.AF_INET6)
+            v4_ip, v6_ip = self.get_ip_pair(iface)
             if verbose:
                 CLIOutputManager.print_interface_status(iface, v4_ip, v6_ip)
             ip_list[iface] = (v4_ip, v6_ip)
-        return ip_list
\ No newline at end of file
+        return ip_list
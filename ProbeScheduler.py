@@ -0,0 +1,185 @@
+import atexit
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from time import monotonic
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+
+class ProbeJob:
+    def __init__(self, interface: str, resolver: str, fn, args, kwargs):
+        self.interface = interface
+        self.resolver = resolver
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+
+
+class ProbeScheduler:
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+    # Well below the per-client limits public resolvers document, so sweeps never trip their throttling
+    RESOLVER_RATE = 50
+    RESOLVER_BURST = 20
+    INTERFACE_RATE = 200
+    INTERFACE_BURST = 64
+    MAX_IN_FLIGHT = 64
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, resolver_rate: float = None, resolver_burst: float = None,
+                 interface_rate: float = None, interface_burst: float = None, max_in_flight: int = None):
+        self.resolver_rate = resolver_rate or self.RESOLVER_RATE
+        self.resolver_burst = resolver_burst or self.RESOLVER_BURST
+        self.interface_rate = interface_rate or self.INTERFACE_RATE
+        self.interface_burst = interface_burst or self.INTERFACE_BURST
+        self.max_in_flight = max_in_flight or self.MAX_IN_FLIGHT
+
+        self._resolver_buckets = {}
+        self._interface_buckets = {}
+        # priority -> interface -> pending jobs; interfaces are served round-robin within a priority
+        self._queues = {self.INTERACTIVE: OrderedDict(), self.BACKGROUND: OrderedDict()}
+        self._in_flight = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="gov6-probe-scheduler", daemon=True)
+        self._dispatcher.start()
+
+    @classmethod
+    def shared(cls):
+        # One scheduler per process so the in-flight cap and per-resolver limits hold across all callers
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+                # Probes run on daemon threads, so exit only has to drop what is still queued
+                atexit.register(cls._shared.shutdown, wait=False, cancel_pending=True)
+            return cls._shared
+
+    def submit(self, interface: str, resolver: str, fn, *args, priority=INTERACTIVE, **kwargs):
+        job = ProbeJob(interface, resolver, fn, args, kwargs)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("ProbeScheduler is shut down")
+            self._queues[priority].setdefault(interface, deque()).append(job)
+            self._condition.notify()
+        return job.future
+
+    def shutdown(self, wait=True, cancel_pending=False):
+        # wait=True drains everything already submitted; cancel_pending drops queued probes instead.
+        # Probes already running are never interrupted, their threads are daemons bounded by the DNS timeout
+        with self._condition:
+            self._closed = True
+            if cancel_pending:
+                for job in self._drain_queues():
+                    job.future.cancel()
+            self._condition.notify_all()
+        if wait:
+            self._dispatcher.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+    def _drain_queues(self):
+        jobs = [job for queue in self._queues.values() for jobs in queue.values() for job in jobs]
+        for queue in self._queues.values():
+            queue.clear()
+        return jobs
+
+    def _bucket(self, buckets, key, rate, burst):
+        if key not in buckets:
+            buckets[key] = TokenBucket(rate, burst)
+        return buckets[key]
+
+    def _next_job(self, now):
+        # Returns (job, None) when something can run, else (None, seconds until a token frees up)
+        min_wait = None
+        for priority in (self.INTERACTIVE, self.BACKGROUND):
+            queue = self._queues[priority]
+            for interface in list(queue):
+                jobs = queue[interface]
+                iface_bucket = self._bucket(self._interface_buckets, interface,
+                                            self.interface_rate, self.interface_burst)
+                iface_wait = iface_bucket.wait_time(now)
+                if iface_wait:
+                    min_wait = iface_wait if min_wait is None else min(min_wait, iface_wait)
+                    continue
+                for job in jobs:
+                    resolver_bucket = self._bucket(self._resolver_buckets, job.resolver,
+                                                   self.resolver_rate, self.resolver_burst)
+                    resolver_wait = resolver_bucket.wait_time(now)
+                    if resolver_wait:
+                        min_wait = resolver_wait if min_wait is None else min(min_wait, resolver_wait)
+                        continue
+                    iface_bucket.consume()
+                    resolver_bucket.consume()
+                    jobs.remove(job)
+                    # Move the interface to the back so the next pick favours the others
+                    queue.move_to_end(interface)
+                    if not jobs:
+                        del queue[interface]
+                    return job, None
+        return None, min_wait
+
+    def _dispatch_loop(self):
+        with self._condition:
+            while True:
+                if self._closed and not any(self._queues.values()):
+                    if self._in_flight == 0:
+                        return
+                    self._condition.wait()
+                    continue
+                if self._in_flight >= self.max_in_flight:
+                    self._condition.wait()
+                    continue
+                job, wait = self._next_job(monotonic())
+                if job is None:
+                    self._condition.wait(wait)
+                    continue
+                try:
+                    threading.Thread(target=self._run, args=(job,), name="gov6-probe", daemon=True).start()
+                except RuntimeError as e:
+                    # No new threads during interpreter shutdown: fail everything left instead of hanging callers
+                    self._closed = True
+                    for pending in [job] + self._drain_queues():
+                        if pending.future.set_running_or_notify_cancel():
+                            pending.future.set_exception(e)
+                    continue
+                self._in_flight += 1
+
+    def _run(self, job: ProbeJob):
+        try:
+            if job.future.set_running_or_notify_cancel():
+                try:
+                    job.future.set_result(job.fn(*job.args, **job.kwargs))
+                except BaseException as e:
+                    job.future.set_exception(e)
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify()
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import os
+import platform
+import socket
+import subprocess
+import tempfile
+from ipaddress import ip_network
+from time import time
+
+from NetworkInterfaces import NetworkInterfaces
+
+
+class NetworkFingerprint:
+    def __init__(self, netinfo: NetworkInterfaces):
+        self.netinfo = netinfo
+
+    def compute(self):
+        # Down interfaces and per-host IPv6 addresses churn without the network changing, so only
+        # up interfaces with their IPv4 addresses and IPv6 /64 prefixes go into the hash
+        interfaces = {
+            iface: self.stable_addresses(addrs)
+            for iface, (isup, addrs) in self.netinfo.snapshot.items()
+            if isup
+        }
+        material = {
+            "interfaces": interfaces,
+            "gateway": self.get_default_gateway(),
+            "resolvers": self.get_system_resolvers(),
+        }
+        encoded = json.dumps(material, sort_keys=True).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    @staticmethod
+    def stable_addresses(addrs):
+        stable = set()
+        for family, address in addrs:
+            if family == socket.AF_INET:
+                stable.add(address)
+            elif family == socket.AF_INET6:
+                try:
+                    stable.add(str(ip_network(f"{address}/64", strict=False)))
+                except ValueError:
+                    continue
+        return sorted(stable)
+
+    @staticmethod
+    def get_default_gateway():
+        try:
+            if platform.system() == "Darwin":
+                output = subprocess.check_output(["route", "-n", "get", "default"], text=True,
+                                                 stderr=subprocess.DEVNULL)
+                for line in output.splitlines():
+                    if line.strip().startswith("gateway:"):
+                        return line.split(":", 1)[1].strip()
+            else:
+                output = subprocess.check_output(["ip", "route", "show", "default"], text=True,
+                                                 stderr=subprocess.DEVNULL)
+                parts = output.split()
+                if "via" in parts:
+                    return parts[parts.index("via") + 1]
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            pass
+        return None
+
+    @staticmethod
+    def get_system_resolvers(path="/etc/resolv.conf"):
+        # resolv.conf is cheap to read and changes whenever the active resolver set does
+        try:
+            with open(path) as f:
+                return [line.split()[1] for line in f
+                        if line.startswith("nameserver") and len(line.split()) > 1]
+        except OSError:
+            return []
+
+
+class NetworkStateCache:
+    MAX_ENTRIES = 16
+    MAX_AGE = 6 * 60 * 60
+    # Keys every cached record must carry to be rebuilt into Resolver / InterceptionVerdict objects
+    REQUIRED_RECORD_KEYS = {
+        "resolvers": ("interface", "ip", "source"),
+        "verdicts": ("interface", "label", "ip", "status"),
+    }
+
+    def __init__(self, path: str = None, max_entries: int = None, max_age: float = None):
+        self.path = path or self.default_path()
+        self.max_entries = max_entries if max_entries is not None else self.MAX_ENTRIES
+        self.max_age = max_age if max_age is not None else self.MAX_AGE
+
+    @staticmethod
+    def default_path():
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        return os.path.join(base, "gov6", "state.json")
+
+    def load(self, fingerprint: str):
+        entry = self._read().get(fingerprint)
+        if not entry or time() - entry["saved_at"] > self.max_age:
+            return None
+        return entry["state"]
+
+    def save(self, fingerprint: str, state: dict):
+        entries = self._read()
+        now = time()
+        entries[fingerprint] = {"saved_at": now, "state": state}
+        entries = {key: entry for key, entry in entries.items() if now - entry["saved_at"] <= self.max_age}
+        newest = sorted(entries, key=lambda key: entries[key]["saved_at"], reverse=True)[:self.max_entries]
+        self._write({key: entries[key] for key in newest})
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(entries, dict):
+            return {}
+        # Entries of the wrong shape are dropped here, so they read as a cache miss and are overwritten
+        return {key: entry for key, entry in entries.items() if self._valid_entry(entry)}
+
+    def _valid_entry(self, entry):
+        if not isinstance(entry, dict) or not isinstance(entry.get("saved_at"), (int, float)):
+            return False
+        state = entry.get("state")
+        if not isinstance(state, dict):
+            return False
+        for name, keys in self.REQUIRED_RECORD_KEYS.items():
+            records = state.get(name)
+            if not isinstance(records, list):
+                return False
+            if not all(isinstance(record, dict) and all(key in record for key in keys) for record in records):
+                return False
+        interfaces = state.get("interfaces", {})
+        if not isinstance(interfaces, dict):
+            return False
+        for snapshot in interfaces.values():
+            if not isinstance(snapshot, dict) or "up" not in snapshot:
+                return False
+            addresses = snapshot.get("addresses")
+            if not isinstance(addresses, list) or not all(
+                    isinstance(address, list) and len(address) == 2 for address in addresses):
+                return False
+        return True
+
+    def _write(self, entries: dict):
+        # Write to a sibling temp file and rename it over the cache so readers never see a partial file
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".state-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
@@ -241,6 +241,47 @@ class CLIOutputManager:
             type_str = type_col(source_type, "90")
 
         print(f"INTERFACE: {interface}  {address_str}  {type_str}  {provider_str} {activity_str}")
+
+    @staticmethod
+    def print_using_cached_state():
+        print(CLIOutputManager.color("Same network as a recent run, showing last verified results "
+                                     "(re-checking in the background)\n", "36"))
+
+    @staticmethod
+    def print_cached_state_changed():
+        print(CLIOutputManager.color("\nDNS configuration changed since the last run, updated results:\n", "33"))
+
+    @staticmethod
+    def print_revalidation_pending():
+        print(CLIOutputManager.color("Background re-check did not finish in time and was cancelled; "
+                                     "the cached results above were not re-verified.", "90"))
+
+    @staticmethod
+    def print_checking_interception():
+        print(CLIOutputManager.color("\nComparing answers from local and public resolvers for DNS interception\n", "36"))
+
+    @staticmethod
+    def print_interception_status(verdict):
+        interface = verdict.interface.ljust(15)
+        label = verdict.label.ljust(24)
+        address_str = CLIOutputManager.color(f"| Address: {verdict.ip.ljust(30)} |", "32")
+        rtt = f"{verdict.rtt * 1000:.1f} ms" if verdict.rtt is not None else "-"
+        rtt_str = CLIOutputManager.color(f"| {rtt.rjust(9)} |", "90")
+
+        if verdict.status == verdict.DIRECT:
+            status_str = CLIOutputManager.color("|    Direct   |", "32")
+        elif verdict.status == verdict.INTERCEPTED:
+            status_str = CLIOutputManager.color("| Intercepted |", "33")
+        elif verdict.status == verdict.LOCAL:
+            status_str = CLIOutputManager.color("|    Local    |", "36")
+        else:
+            status_str = CLIOutputManager.color("| Unreachable |", "31")
+
+        print(f"INTERFACE: {interface}  {label}  {address_str}  {status_str} {rtt_str}")
+        if verdict.status == verdict.INTERCEPTED:
+            for reason in verdict.reasons:
+                print(CLIOutputManager.color(f"    - {reason}", "33"))
+
     @staticmethod
     def banner_phase(title: str, subtitle: str):
         print(CLIOutputManager.color(f"""
@@ -0,0 +1,187 @@
+import socket
+import threading
+
+import dns.message
+import dns.name
+import dns.rcode
+import dns.rrset
+import pytest
+
+from DNSConfig import Resolver
+from DNSInterception import DNSInterceptionDetector, InterceptionVerdict, ProbeResult
+from ProbeScheduler import ProbeScheduler
+
+PUBLIC_SERVERS = {
+    "Google": ("8.8.8.8",),
+    "Cloudflare": ("1.1.1.1",),
+}
+
+# Honest per-server answers: every resolver has its own identity, egress and timing
+HONEST_ANSWERS = {
+    "8.8.8.8": {"identity": "google", "whoami": "74.125.0.1", "ttl": 120, "rtt": 0.012},
+    "1.1.1.1": {"identity": "cloudflare", "whoami": "162.158.0.1", "ttl": 250, "rtt": 0.020},
+    "192.168.1.1": {"identity": "router", "whoami": "203.0.113.7", "ttl": 300, "rtt": 0.001},
+}
+
+
+def honest_query(self, source_ip, target_ip, qname, rdtype, rdclass):
+    answer = HONEST_ANSWERS[target_ip]
+    if qname.startswith("gov6-"):
+        return ProbeResult(True, dns.rcode.NXDOMAIN, frozenset(), None, answer["rtt"])
+    if qname == "id.server":
+        return ProbeResult(True, dns.rcode.NOERROR, frozenset({answer["identity"]}), 0, answer["rtt"])
+    if qname.startswith("o-o.myaddr"):
+        return ProbeResult(True, dns.rcode.NOERROR, frozenset({answer["whoami"]}), 60, answer["rtt"])
+    return ProbeResult(True, dns.rcode.NOERROR, frozenset({"142.250.0.1"}), answer["ttl"], answer["rtt"])
+
+
+def detect(monkeypatch, resolvers):
+    monkeypatch.setattr(DNSInterceptionDetector, "_query", honest_query)
+    detector = DNSInterceptionDetector([("en0", ("192.168.1.20", None))], resolvers, PUBLIC_SERVERS)
+    return {(verdict.label, verdict.ip): verdict for verdict in detector.detect()}
+
+
+def test_public_server_used_as_custom_resolver_is_direct(monkeypatch):
+    verdicts = detect(monkeypatch, [Resolver("en0", "8.8.8.8", "Custom")])
+
+    assert verdicts[("Custom resolver", "8.8.8.8")].status == InterceptionVerdict.LOCAL
+    assert verdicts[("Google", "8.8.8.8")].status == InterceptionVerdict.DIRECT
+    assert verdicts[("Cloudflare", "1.1.1.1")].status == InterceptionVerdict.DIRECT
+
+
+def test_honest_network_has_no_interception(monkeypatch):
+    verdicts = detect(monkeypatch, [Resolver("en0", "192.168.1.1", "Likely DHCP provisioned")])
+
+    assert verdicts[("Google", "8.8.8.8")].status == InterceptionVerdict.DIRECT
+    assert verdicts[("Cloudflare", "1.1.1.1")].status == InterceptionVerdict.DIRECT
+
+
+def test_matching_ttl_and_timing_alone_are_not_interception(monkeypatch):
+    # The router and Cloudflare both fetch google.com fresh and answer within the timing tolerance
+    monkeypatch.setitem(HONEST_ANSWERS, "1.1.1.1",
+                        {"identity": "cloudflare", "whoami": "162.158.0.1", "ttl": 300, "rtt": 0.0015})
+    verdicts = detect(monkeypatch, [Resolver("en0", "192.168.1.1", "Likely DHCP provisioned")])
+
+    assert verdicts[("Cloudflare", "1.1.1.1")].status == InterceptionVerdict.DIRECT
+
+
+def test_shared_egress_with_matching_cache_is_interception(monkeypatch):
+    monkeypatch.setitem(HONEST_ANSWERS, "1.1.1.1",
+                        {"identity": "cloudflare", "whoami": "203.0.113.7", "ttl": 300, "rtt": 0.020})
+    verdicts = detect(monkeypatch, [Resolver("en0", "192.168.1.1", "Likely DHCP provisioned")])
+
+    assert verdicts[("Cloudflare", "1.1.1.1")].status == InterceptionVerdict.INTERCEPTED
+
+
+def test_local_resolver_forwarding_to_provider_is_not_interception(monkeypatch):
+    # A router forwarding to Cloudflare relays Cloudflare's colo identity, egress and cached TTL
+    monkeypatch.setitem(HONEST_ANSWERS, "1.1.1.1",
+                        {"identity": "FRA", "whoami": "162.158.0.1", "ttl": 250, "rtt": 0.010})
+    monkeypatch.setitem(HONEST_ANSWERS, "192.168.1.1",
+                        {"identity": "FRA", "whoami": "162.158.0.1", "ttl": 250, "rtt": 0.011})
+    verdicts = detect(monkeypatch, [Resolver("en0", "192.168.1.1", "Likely DHCP provisioned")])
+
+    assert verdicts[("Cloudflare", "1.1.1.1")].status == InterceptionVerdict.DIRECT
+    assert verdicts[("Google", "8.8.8.8")].status == InterceptionVerdict.DIRECT
+
+
+class StandInResponder:
+    # Minimal UDP DNS server on a loopback address, recording the source address of each query
+    def __init__(self, ip, port, identity, egress, hijack_nonce=False):
+        self.identity = identity
+        self.egress = egress
+        self.hijack_nonce = hijack_nonce
+        self.sources = []
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((ip, port))
+        self.sock.settimeout(0.1)
+        self.running = True
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        while self.running:
+            try:
+                data, addr = self.sock.recvfrom(4096)
+            except socket.timeout:
+                continue
+            self.sources.append(addr[0])
+            query = dns.message.from_wire(data)
+            response = dns.message.make_response(query)
+            qname = query.question[0].name
+            name = qname.to_text()
+            if name.startswith("gov6-"):
+                if self.hijack_nonce:
+                    response.answer.append(dns.rrset.from_text(qname, 60, "IN", "A", "10.9.9.9"))
+                else:
+                    response.set_rcode(dns.rcode.NXDOMAIN)
+            elif name == "id.server.":
+                half = len(self.identity) // 2
+                response.answer.append(dns.rrset.from_text(
+                    qname, 0, "CH", "TXT", f'"{self.identity[:half]}" "{self.identity[half:]}"'))
+            elif name.startswith("o-o.myaddr"):
+                response.answer.append(dns.rrset.from_text(
+                    qname, 60, "IN", "TXT", f'"{self.egress}"', '"edns0-client-subnet 127.0.0.0/24"'))
+            else:
+                target = dns.name.from_text("www.google.com.")
+                response.answer.append(dns.rrset.from_text(qname, 30, "IN", "CNAME", target.to_text()))
+                response.answer.append(dns.rrset.from_text(target, 300, "IN", "A", "142.250.0.1"))
+            self.sock.sendto(response.to_wire(), addr)
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        self.sock.close()
+
+
+@pytest.fixture
+def responders():
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        probe.bind(("127.0.0.2", 0))
+    except OSError:
+        pytest.skip("127.0.0.2 is not routable on this loopback interface")
+    port = probe.getsockname()[1]
+    probe.close()
+
+    started = {
+        "127.0.0.2": StandInResponder("127.0.0.2", port, "router", "203.0.113.7"),
+        "127.0.0.3": StandInResponder("127.0.0.3", port, "google-fra", "74.125.0.1"),
+        "127.0.0.4": StandInResponder("127.0.0.4", port, "router", "203.0.113.7", hijack_nonce=True),
+    }
+    yield port, started
+    for responder in started.values():
+        responder.stop()
+
+
+def test_query_parses_wire_answers(responders):
+    port, started = responders
+    with ProbeScheduler() as scheduler:
+        detector = DNSInterceptionDetector([], [], {}, timeout=1, port=port, scheduler=scheduler)
+
+        identity = detector._query("127.0.0.1", "127.0.0.3", "id.server", "TXT", "CH")
+        whoami = detector._query("127.0.0.1", "127.0.0.3", "o-o.myaddr.l.google.com", "TXT", "IN")
+        cache = detector._query("127.0.0.1", "127.0.0.3", "google.com", "A", "IN")
+        nonce = detector._query("127.0.0.1", "127.0.0.3", "gov6-abc.example.com", "A", "IN")
+
+    assert identity.records == frozenset({"google-fra"})
+    assert whoami.records == frozenset({"74.125.0.1"})
+    assert cache.ttl == 30
+    assert cache.records == frozenset({"www.google.com.", "142.250.0.1"})
+    assert nonce.rcode == dns.rcode.NXDOMAIN and not nonce.records
+    assert set(started["127.0.0.3"].sources) == {"127.0.0.1"}
+
+
+def test_detect_against_stand_in_responders(responders):
+    port, started = responders
+    public_servers = {"Google": ("127.0.0.3",), "Cloudflare": ("127.0.0.4",)}
+    resolvers = [Resolver("lo", "127.0.0.2", "Likely DHCP provisioned")]
+    with ProbeScheduler() as scheduler:
+        detector = DNSInterceptionDetector([("lo", ("127.0.0.1", None))], resolvers, public_servers,
+                                           timeout=1, port=port, scheduler=scheduler)
+        verdicts = {verdict.ip: verdict for verdict in detector.detect()}
+
+    assert verdicts["127.0.0.2"].status == InterceptionVerdict.LOCAL
+    assert verdicts["127.0.0.3"].status == InterceptionVerdict.DIRECT
+    assert verdicts["127.0.0.4"].status == InterceptionVerdict.INTERCEPTED
+    assert "Synthesized answer for a nonexistent nonce name" in verdicts["127.0.0.4"].reasons
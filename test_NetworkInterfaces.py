@@ -0,0 +1,93 @@
+import json
+import socket
+
+from DNSConfig import DNSConfigChecker, Resolver
+from NetworkInterfaces import InterfaceDiff, NetworkInterfaces
+
+V4 = (socket.AF_INET, "192.168.1.20")
+V6 = (socket.AF_INET6, "2001:db8::20")
+
+
+def test_diff_reports_every_kind_of_change():
+    old = {
+        "en0": (True, frozenset({V4})),
+        "en1": (True, frozenset()),
+        "en2": (False, frozenset()),
+        "bridge0": (True, frozenset({(socket.AF_INET, "10.0.0.1")})),
+    }
+    new = {
+        "en0": (True, frozenset({V6})),
+        "en1": (False, frozenset()),
+        "en2": (True, frozenset()),
+        "utun4": (True, frozenset({(socket.AF_INET, "10.8.0.2")})),
+    }
+
+    diff = InterfaceDiff.compute(old, new)
+
+    assert diff.added == {"utun4"}
+    assert diff.removed == {"bridge0"}
+    assert diff.went_down == {"en1"}
+    assert diff.went_up == {"en2"}
+    assert diff.addresses_gained == {"en0": [V6], "utun4": [(socket.AF_INET, "10.8.0.2")]}
+    assert diff.addresses_lost == {"en0": [V4], "bridge0": [(socket.AF_INET, "10.0.0.1")]}
+    assert diff.changed_interfaces() == {"en0", "en1", "en2", "utun4", "bridge0"}
+
+
+def test_unchanged_snapshot_gives_empty_diff():
+    snapshot = {"en0": (True, frozenset({V4, V6}))}
+
+    assert not InterfaceDiff.compute(snapshot, dict(snapshot))
+
+
+def test_snapshot_survives_json_round_trip():
+    netinfo = NetworkInterfaces.__new__(NetworkInterfaces)
+    netinfo.snapshot = {"en0": (True, frozenset({V4, V6})), "lo0": (False, frozenset())}
+
+    restored = NetworkInterfaces.snapshot_from_dict(json.loads(json.dumps(netinfo.snapshot_to_dict())))
+
+    assert restored == netinfo.snapshot
+    assert not InterfaceDiff.compute(restored, netinfo.snapshot)
+
+
+class RecordingChecker(DNSConfigChecker):
+    def __init__(self, interfaces, discovered):
+        super().__init__(interfaces, None)
+        self.discovered = discovered
+        self.calls = []
+
+    def _discover_resolvers(self, interfaces, only=None):
+        self.calls.append(([interface[0] for interface in interfaces], only))
+        return [resolver for resolver in self.discovered if resolver.interface in only]
+
+
+def test_refresh_rediscovers_only_changed_interfaces():
+    interfaces = [("en0", None), ("en1", None)]
+    checker = RecordingChecker(interfaces, [Resolver("en1", "9.9.9.9", "Custom")])
+    checker.load_resolvers([Resolver("en0", "1.1.1.1", "Custom"), Resolver("en1", "8.8.8.8", "Custom")])
+
+    resolvers = checker.refresh_resolvers(interfaces, InterfaceDiff(addresses_gained={"en1": [V6]}))
+
+    assert checker.calls == [(["en1"], {"en1"})]
+    assert [(resolver.interface, resolver.ip) for resolver in resolvers] == [("en0", "1.1.1.1"), ("en1", "9.9.9.9")]
+
+
+def test_refresh_skips_discovery_for_unqueried_interfaces():
+    interfaces = [("en0", None)]
+    checker = RecordingChecker(interfaces, [])
+    checker.load_resolvers([Resolver("en0", "1.1.1.1", "Custom")])
+
+    resolvers = checker.refresh_resolvers(interfaces, InterfaceDiff(went_down=["awdl0"], went_up=["llw0"]))
+
+    assert checker.calls == []
+    assert [resolver.ip for resolver in resolvers] == ["1.1.1.1"]
+
+
+def test_refresh_rediscovers_changed_tun_outside_online_list():
+    interfaces = [("en0", None)]
+    checker = RecordingChecker(interfaces, [Resolver("utun4", "10.8.0.1", "VPN Tunnel Provided")])
+    checker.load_resolvers([Resolver("en0", "1.1.1.1", "Custom")])
+
+    resolvers = checker.refresh_resolvers(interfaces, InterfaceDiff(added=["utun4"]))
+
+    assert checker.calls == [([], {"utun4"})]
+    assert [resolver.ip for resolver in resolvers] == ["1.1.1.1", "10.8.0.1"]
@@ -0,0 +1,130 @@
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+from time import monotonic, sleep
+
+import pytest
+
+from ProbeScheduler import ProbeScheduler
+
+REPO = os.path.dirname(os.path.abspath(__file__))
+
+
+def queue_behind_blocker(scheduler):
+    # Occupies the only in-flight slot so everything submitted afterwards queues up until release
+    release = threading.Event()
+    blocker = scheduler.submit("blocker", "blocker", release.wait)
+    sleep(0.05)
+    return release, blocker
+
+
+def test_resolver_bucket_paces_probes():
+    with ProbeScheduler(resolver_rate=20, resolver_burst=2) as scheduler:
+        start = monotonic()
+        paced = [scheduler.submit("en0", "8.8.8.8", monotonic) for _ in range(6)]
+        other = scheduler.submit("en0", "1.1.1.1", monotonic)
+        times = [future.result(timeout=2) for future in paced]
+
+    # Two go out on the burst, the remaining four wait 1/20 s each for tokens
+    assert times[-1] - start >= 0.18
+    assert other.result() - start < 0.1
+
+
+def test_in_flight_cap():
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def probe():
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    with ProbeScheduler(max_in_flight=3) as scheduler:
+        futures = [scheduler.submit("en0", f"10.0.0.{i}", probe) for i in range(10)]
+        for future in futures:
+            future.result(timeout=2)
+
+    assert running[1] == 3
+
+
+def test_interfaces_are_served_round_robin():
+    order = []
+    with ProbeScheduler(max_in_flight=1) as scheduler:
+        release, blocker = queue_behind_blocker(scheduler)
+        futures = [scheduler.submit("en0", "8.8.8.8", order.append, "en0") for _ in range(3)]
+        futures += [scheduler.submit("utun4", "1.1.1.1", order.append, "utun4") for _ in range(3)]
+        release.set()
+        for future in futures:
+            future.result(timeout=2)
+
+    assert order == ["en0", "utun4"] * 3
+
+
+def test_interactive_probes_run_before_background():
+    order = []
+    with ProbeScheduler(max_in_flight=1) as scheduler:
+        release, blocker = queue_behind_blocker(scheduler)
+        futures = [scheduler.submit("en0", "8.8.8.8", order.append, "background",
+                                    priority=ProbeScheduler.BACKGROUND) for _ in range(3)]
+        futures += [scheduler.submit("en0", "1.1.1.1", order.append, "interactive") for _ in range(3)]
+        release.set()
+        for future in futures:
+            future.result(timeout=2)
+
+    assert order == ["interactive"] * 3 + ["background"] * 3
+
+
+def test_background_runs_while_interactive_waits_for_tokens():
+    order = []
+    with ProbeScheduler(resolver_rate=5, resolver_burst=1) as scheduler:
+        futures = [scheduler.submit("en0", "8.8.8.8", order.append, "interactive") for _ in range(2)]
+        futures.append(scheduler.submit("en0", "1.1.1.1", order.append, "background",
+                                        priority=ProbeScheduler.BACKGROUND))
+        for future in futures:
+            future.result(timeout=2)
+
+    assert order == ["interactive", "background", "interactive"]
+
+
+def test_shutdown_drains_queued_probes():
+    scheduler = ProbeScheduler(resolver_rate=50, resolver_burst=1)
+    futures = [scheduler.submit("en0", "8.8.8.8", lambda i=i: i) for i in range(5)]
+
+    scheduler.shutdown()
+
+    assert all(future.done() for future in futures)
+    assert [future.result() for future in futures] == list(range(5))
+
+
+def test_exit_with_queued_probes_is_clean():
+    script = textwrap.dedent("""
+        import time
+        from ProbeScheduler import ProbeScheduler
+
+        scheduler = ProbeScheduler.shared()
+        for i in range(100):
+            scheduler.submit("en0", f"10.0.0.{i % 3}", time.sleep, 2, priority=ProbeScheduler.BACKGROUND)
+        time.sleep(0.1)
+    """)
+    result = subprocess.run([sys.executable, "-c", script], cwd=REPO, capture_output=True, text=True, timeout=10)
+
+    assert result.returncode == 0
+    assert result.stderr == ""
+
+
+def test_cancel_pending_cancels_queued_probes():
+    scheduler = ProbeScheduler(resolver_rate=1, resolver_burst=1)
+    first = scheduler.submit("en0", "8.8.8.8", lambda: "ran")
+    queued = [scheduler.submit("en0", "8.8.8.8", lambda: "ran") for _ in range(3)]
+    assert first.result(timeout=1) == "ran"
+
+    scheduler.shutdown(cancel_pending=True)
+
+    assert all(future.cancelled() for future in queued)
+    with pytest.raises(RuntimeError):
+        scheduler.submit("en0", "8.8.8.8", lambda: "ran")
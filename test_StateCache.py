@@ -0,0 +1,75 @@
+import json
+import socket
+from time import time
+
+import pytest
+
+from StateCache import NetworkFingerprint, NetworkStateCache
+
+VALID_STATE = {
+    "resolvers": [{"interface": "en0", "ip": "1.1.1.1", "source": "Custom", "isActive": True}],
+    "verdicts": [{"interface": "en0", "label": "Cloudflare", "ip": "1.1.1.1", "status": "Direct"}],
+}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return NetworkStateCache(str(tmp_path / "state.json"))
+
+
+def test_round_trip(cache):
+    cache.save("fp", VALID_STATE)
+    assert cache.load("fp") == VALID_STATE
+
+
+@pytest.mark.parametrize("entry", [
+    "not a dict",
+    {"saved_at": time()},
+    {"saved_at": "now", "state": VALID_STATE},
+    {"state": VALID_STATE},
+    {"saved_at": time(), "state": {"verdicts": []}},
+    {"saved_at": time(), "state": {"resolvers": [{"ip": "1.1.1.1"}], "verdicts": []}},
+    {"saved_at": time(), "state": {**VALID_STATE, "interfaces": {"en0": {"up": True, "addresses": ["1.1.1.1"]}}}},
+])
+def test_malformed_entry_is_a_miss(cache, entry):
+    with open(cache.path, "w") as f:
+        json.dump({"fp": entry}, f)
+
+    assert cache.load("fp") is None
+    cache.save("other", VALID_STATE)
+    assert cache.load("other") == VALID_STATE
+
+
+class StubInterfaces:
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+
+def fingerprint(monkeypatch, snapshot):
+    monkeypatch.setattr(NetworkFingerprint, "get_default_gateway", staticmethod(lambda: "192.168.1.1"))
+    monkeypatch.setattr(NetworkFingerprint, "get_system_resolvers", staticmethod(lambda: ["192.168.1.1"]))
+    return NetworkFingerprint(StubInterfaces(snapshot)).compute()
+
+
+def test_fingerprint_ignores_down_interfaces_and_temporary_ipv6(monkeypatch):
+    before = {
+        "en0": (True, frozenset({(socket.AF_INET, "192.168.1.20"),
+                                 (socket.AF_INET6, "2001:db8:1:2:aaaa:bbbb:cccc:dddd")})),
+        "en5": (False, frozenset({(socket.AF_INET, "10.0.0.9")})),
+    }
+    after = {
+        "en0": (True, frozenset({(socket.AF_INET, "192.168.1.20"),
+                                 (socket.AF_INET6, "2001:db8:1:2:1111:2222:3333:4444")})),
+        "en5": (False, frozenset()),
+    }
+
+    assert fingerprint(monkeypatch, before) == fingerprint(monkeypatch, after)
+
+
+def test_fingerprint_tracks_ipv4_and_ipv6_prefix(monkeypatch):
+    base = {"en0": (True, frozenset({(socket.AF_INET, "192.168.1.20"), (socket.AF_INET6, "2001:db8:1:2::5")}))}
+    new_ipv4 = {"en0": (True, frozenset({(socket.AF_INET, "192.168.1.21"), (socket.AF_INET6, "2001:db8:1:2::5")}))}
+    new_prefix = {"en0": (True, frozenset({(socket.AF_INET, "192.168.1.20"), (socket.AF_INET6, "2001:db8:1:3::5")}))}
+
+    assert fingerprint(monkeypatch, base) != fingerprint(monkeypatch, new_ipv4)
+    assert fingerprint(monkeypatch, base) != fingerprint(monkeypatch, new_prefix)